@@ -0,0 +1,917 @@
+"""Benchmarks de StockPro sur une base SQLite temporaire.
+
+Usage : python bench.py dashboard [--tailles 1000 10000 100000]
+        python bench.py concurrence [--threads 8] [--mouvements 2000]
+        python bench.py depots [--depots 1 2 4 8] [--threads 8] [--tenue-ms 2]
+        python bench.py import [--lignes 100000] [--taille-lot 1000]
+        python bench.py pagination [--mouvements 1000000] [--page 10000]
+        python bench.py export [--mouvements 1000000] [--plafond-mo 50]
+        python bench.py historique [--mouvements 1000000] [--annees 3]
+        python bench.py analyses [--produits 100000] [--mouvements 2000000] [--annees 5]
+        python bench.py previsions [--produits 100000] [--mouvements 2000000] [--processus 1 4]
+        python bench.py graphes [--produits 100000] [--mouvements 2000000] [--jours 365]
+        python bench.py archivage [--produits 10000] [--mouvements-par-an 400000] [--annees 5]
+        python bench.py recherche [--produits 100000]
+        python bench.py sync [--tailles 10000 100000] [--modifications 100]
+        python bench.py budgets
+        python bench.py cache
+        python bench.py generer [--produits 100000] [--mouvements 20000000] [--jours 1095]
+        python bench.py charge [--concurrence 8] [--duree 30] [--sortie charge.json] [--comparer ancien.json]
+
+DATABASE_URL permet de viser une autre base (MySQL par exemple) ; avec une base
+persistante, `generer` la remplit une fois et `charge --reutiliser` la réutilise.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+_db_file = os.path.join(tempfile.mkdtemp(prefix='stockpro-bench-'), 'bench.db')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + _db_file)
+os.environ.setdefault('HISTORIQUE_DOSSIER', os.path.join(os.path.dirname(_db_file), 'historique'))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+import app as stockpro  # noqa: E402
+from app import (app, db, Produit, Mouvement, Utilisateur, reconstruire_journal,  # noqa: E402
+                 Categorie, Fournisseur, Alerte, MouvementJournalier, balayer_alertes,
+                 reindexer_produits, importer_mouvements, encoder_curseur,
+                 stocks_au, prendre_instantane, mouvement_signe, calculer_analyses,
+                 calculer_previsions, appliquer_mouvement, compter_requetes, BudgetRequetesDepasse,
+                 historique_stocks, archiver, requete_export, lignes_export, initialiser_modifications,
+                 Depot, StockDepot, initialiser_depots, compteurs_alertes,
+                 total_approximatif, version_stats, instantane_stats, instantane_tableau_de_bord)
+
+
+def reinitialiser():
+    # Oublie les objets chargés par un scénario précédent (ids réutilisés après drop_all),
+    # ainsi que le dépôt principal et les listes de référence mémorisés par le processus
+    db.session.expunge_all()
+    stockpro._depots_principaux.clear()
+    stockpro.references._donnees.clear()
+    db.drop_all()
+    db.create_all()
+    db.session.add(Utilisateur(nom='Bench', login='bench', role='ADMIN',
+                               mot_de_passe=generate_password_hash('bench')))
+    db.session.commit()
+
+
+def client_connecte():
+    client = app.test_client()
+    client.post('/login', data={'login': 'bench', 'password': 'bench'})
+    return client
+
+
+def remplir(nb_produits, nb_mouvements=50000, jours=60):
+    """Insère `nb_produits` produits et `nb_mouvements` mouvements en masse."""
+    maintenant = datetime.utcnow()
+    produits = [
+        {'id_produit': i, 'code': f'P{i:07d}', 'nom': f'Produit {i}', 'unite': 'u',
+         'prix_unitaire': random.randint(1, 500), 'seuil_min': 5, 'stock_actuel': random.randint(0, 200)}
+        for i in range(1, nb_produits + 1)
+    ]
+    db.session.execute(db.insert(Produit), produits)
+    reindexer_produits()
+    for debut in range(0, nb_mouvements, 100000):
+        mouvements = [
+            {'id_produit': random.randint(1, nb_produits), 'type_mouvement': random.choice(('ENTREE', 'SORTIE')),
+             'quantite': random.randint(1, 20),
+             'date_mouvement': maintenant - timedelta(days=random.uniform(0, jours)), 'motif': 'bench'}
+            for _ in range(min(100000, nb_mouvements - debut))
+        ]
+        db.session.execute(db.insert(Mouvement), mouvements)
+    db.session.commit()
+    reconstruire_journal()
+
+
+NOMS = ('Vis', 'Écrou', 'Boulon', 'Câble', 'Papier', 'Stylo', 'Cartouche', 'Gant', 'Casque', 'Disque',
+        'Clavier', 'Souris', 'Classeur', 'Ruban', 'Filtre', 'Joint', 'Ampoule', 'Batterie', 'Tuyau', 'Peinture')
+QUALIFICATIFS = ('acier', 'inox', 'noir', 'bleu', 'A4', 'A3', 'renforcé', 'standard', 'pro', 'mini',
+                 'haute tension', 'isolé', 'jetable', 'recyclé', 'industriel')
+
+
+def generer(nb_produits, nb_mouvements, jours=1095, nb_categories=50, nb_fournisseurs=200, graine=1):
+    """Remplit toutes les tables avec des volumes et des distributions réalistes.
+
+    Popularité des produits en loi de Zipf, mouvements plus denses sur la
+    période récente et aux heures ouvrées, journal quotidien reconstruit à
+    partir des stocks, alertes ouvertes pour les produits sous le seuil et
+    alertes traitées passées. Mouvements et stocks sont placés dans le dépôt
+    principal, comme après `flask initialiser-depots`.
+    """
+    hasard = random.Random(graine)
+    maintenant = datetime.utcnow()
+    db.session.execute(db.insert(Categorie), [
+        {'id_categorie': i, 'nom': f'Catégorie {i}', 'description': ''} for i in range(1, nb_categories + 1)])
+    db.session.execute(db.insert(Fournisseur), [
+        {'id_fournisseur': i, 'nom': f'Fournisseur {i}', 'ville': hasard.choice(('Dakar', 'Abidjan', 'Lomé', 'Cotonou')),
+         'delai_livraison': hasard.choice((3, 7, 14, 30))} for i in range(1, nb_fournisseurs + 1)])
+    id_depot = stockpro.depot_principal()
+
+    produits = []
+    for i in range(1, nb_produits + 1):
+        produits.append({
+            'id_produit': i, 'code': f'P{i:07d}',
+            'nom': f'{hasard.choice(NOMS)} {hasard.choice(QUALIFICATIFS)} {i}',
+            'categorie_id': hasard.randint(1, nb_categories) if nb_categories else None,
+            'id_fournisseur': hasard.randint(1, nb_fournisseurs) if nb_fournisseurs else None,
+            'unite': hasard.choice(('u', 'kg', 'm', 'l', 'boîte')), 'prix_unitaire': hasard.randint(100, 50000),
+            'seuil_min': hasard.randint(5, 30), 'stock_actuel': hasard.randint(0, 150)})
+    for debut in range(0, nb_produits, 100000):
+        db.session.execute(db.insert(Produit), produits[debut:debut + 100000])
+
+    # Popularité : le produit de rang r reçoit une part proportionnelle à 1 / r
+    rangs = list(range(1, nb_produits + 1))
+    hasard.shuffle(rangs)
+    poids_cumules, total = [], 0.0
+    for rang in rangs:
+        total += 1 / rang
+        poids_cumules.append(total)
+
+    identifiants = range(1, nb_produits + 1)
+    for debut in range(0, nb_mouvements, 100000):
+        taille = min(100000, nb_mouvements - debut)
+        mouvements = []
+        for id_produit in hasard.choices(identifiants, cum_weights=poids_cumules, k=taille):
+            entree = hasard.random() < 0.35
+            # Entrées et sorties équilibrées en moyenne (0,35 × 19,5 ≈ 0,65 × 10,5)
+            quantite = hasard.randint(10, 29) if entree else hasard.randint(1, 20)
+            # Activité en croissance : plus de mouvements récents ; heures ouvrées
+            jour = maintenant.date() - timedelta(days=int(jours * hasard.random() ** 2))
+            date_mouvement = datetime.combine(jour, datetime.min.time()) + timedelta(
+                hours=hasard.randint(7, 18), minutes=hasard.randint(0, 59), seconds=hasard.randint(0, 59))
+            if date_mouvement > maintenant:
+                date_mouvement -= timedelta(days=1)
+            mouvements.append({'id_produit': id_produit, 'type_mouvement': 'ENTREE' if entree else 'SORTIE',
+                               'quantite': quantite, 'date_mouvement': date_mouvement, 'id_depot': id_depot,
+                               'motif': 'Réception' if entree else 'Consommation',
+                               'reference_doc': f'BL-{hasard.randint(1, 99999):05d}' if entree else None})
+        db.session.execute(db.insert(Mouvement), mouvements)
+
+    # Alertes traitées passées sur 2 % des produits
+    alertes = [{'id_produit': hasard.randint(1, nb_produits), 'statut': 'TRAITEE', 'message': 'Stock normal',
+                'date_alerte': maintenant - timedelta(days=hasard.randint(1, jours))}
+               for _ in range(nb_produits // 50)]
+    if alertes:
+        db.session.execute(db.insert(Alerte), alertes)
+    db.session.commit()
+    reindexer_produits()
+    reconstruire_journal()
+
+    # Stocks historiques jamais négatifs : on relève chaque produit de son plus bas
+    journal = MouvementJournalier.__table__
+    decalages = [{'b_id': id_produit, 'b_decalage': -minimum} for id_produit, minimum in db.session.execute(
+        db.select(journal.c.id_produit, db.func.min(journal.c.stock_cloture)).group_by(journal.c.id_produit)
+        .having(db.func.min(journal.c.stock_cloture) < 0))]
+    if decalages:
+        produits_table = Produit.__table__
+        db.session.execute(db.update(produits_table).where(produits_table.c.id_produit == db.bindparam('b_id'))
+                           .values(stock_actuel=produits_table.c.stock_actuel + db.bindparam('b_decalage')), decalages)
+        db.session.execute(db.update(journal).where(journal.c.id_produit == db.bindparam('b_id'))
+                           .values(stock_cloture=journal.c.stock_cloture + db.bindparam('b_decalage')), decalages)
+        db.session.commit()
+    balayer_alertes()
+    initialiser_depots()
+
+
+def chronometrer(client, url, repetitions=5):
+    """Latences (ms) de `repetitions` GET sur `url`, après une requête de chauffe."""
+    client.get(url)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        reponse = client.get(url)
+        durees.append((time.perf_counter() - debut) * 1000)
+        assert reponse.status_code == 200, reponse.status_code
+    return durees
+
+
+def bench_dashboard(args):
+    with app.app_context():
+        print(f"{'produits':>10} {'médiane (ms)':>14} {'max (ms)':>10}")
+        for taille in args.tailles:
+            reinitialiser()
+            remplir(taille, args.mouvements)
+            client = client_connecte()
+            durees = chronometrer(client, '/', args.repetitions)
+            print(f'{taille:>10} {statistics.median(durees):>14.1f} {max(durees):>10.1f}')
+
+
+def bench_concurrence(args):
+    """Postes concurrents sur quelques produits : vérifie qu'aucune mise à jour n'est perdue."""
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, 0)
+        stocks_initiaux = dict(db.session.query(Produit.id_produit, Produit.stock_actuel).all())
+        db.session.remove()
+
+    erreurs = []
+
+    def poster(nb):
+        client = client_connecte()
+        for _ in range(nb):
+            reponse = client.post('/mouvement/nouveau', data={
+                'id_produit': random.randint(1, args.produits),
+                'type_mouvement': random.choice(('ENTREE', 'SORTIE')),
+                'quantite': random.randint(1, 10),
+                'motif': 'bench',
+            })
+            if reponse.status_code != 302:
+                erreurs.append(reponse.status_code)
+
+    par_thread = args.mouvements // args.threads
+    threads = [threading.Thread(target=poster, args=(par_thread,)) for _ in range(args.threads)]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duree = time.perf_counter() - debut
+
+    with app.app_context():
+        variations = dict(db.session.query(Mouvement.id_produit, db.func.sum(db.case(
+            (Mouvement.type_mouvement == 'ENTREE', Mouvement.quantite), else_=-Mouvement.quantite
+        ))).group_by(Mouvement.id_produit).all())
+        nb_mouvements = db.session.query(db.func.count(Mouvement.id_mouvement)).scalar()
+        ecarts = [
+            id_produit for id_produit, stock in db.session.query(Produit.id_produit, Produit.stock_actuel)
+            if stock != stocks_initiaux[id_produit] + (variations.get(id_produit) or 0)
+        ]
+    print(f'{nb_mouvements} mouvements en {duree:.2f} s ({nb_mouvements / duree:.0f} mouvements/s), '
+          f'{args.threads} threads, {len(erreurs)} erreurs HTTP')
+    print('stocks cohérents' if not ecarts else f'ÉCARTS sur les produits {ecarts}')
+    if ecarts:
+        raise SystemExit(1)
+
+
+def bench_depots(args):
+    """Débit des mouvements concurrents sur les mêmes produits selon le nombre de dépôts.
+
+    Chaque poste travaille dans un dépôt ; `--tenue-ms` simule le temps passé
+    dans la transaction après la mise à jour du stock (allers-retours réseau).
+    Chaque mouvement met aussi à jour la ligne du produit (stock total) : le
+    débit n'augmente pas avec le nombre de dépôts, le scénario vérifie que les
+    lignes par dépôt n'ajoutent ni attente ni écart au stock total.
+    """
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, 0)
+        initialiser_depots()
+        for numero in range(2, max(args.depots) + 1):
+            db.session.add(Depot(code=f'D{numero}', nom=f'Dépôt {numero}'))
+        db.session.commit()
+        ids_depots = list(db.session.scalars(db.select(Depot.id_depot).order_by(Depot.id_depot)))
+        db.session.remove()
+
+    print(f"{'dépôts':>7} {'mouvements':>11} {'durée (s)':>10} {'mvt/s':>8} {'erreurs':>8}")
+    for nb_depots in args.depots:
+        erreurs = []
+
+        def poster(numero, nb):
+            id_depot = ids_depots[numero % nb_depots]
+            with app.app_context():
+                for _ in range(nb):
+                    try:
+                        appliquer_mouvement(random.randint(1, args.produits), random.choice(('ENTREE', 'SORTIE')),
+                                            random.randint(1, 10), 'bench', id_depot=id_depot)
+                        time.sleep(args.tenue_ms / 1000)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        erreurs.append(e)
+
+        par_thread = args.mouvements // args.threads
+        threads = [threading.Thread(target=poster, args=(numero, par_thread)) for numero in range(args.threads)]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+        nb = par_thread * args.threads - len(erreurs)
+        print(f'{nb_depots:>7} {nb:>11} {duree:>10.2f} {nb / duree:>8.0f} {len(erreurs):>8}')
+
+    with app.app_context():
+        par_depots = dict(db.session.query(StockDepot.id_produit, db.func.sum(StockDepot.quantite))
+                          .group_by(StockDepot.id_produit).all())
+        ecarts = [id_produit for id_produit, stock in db.session.query(Produit.id_produit, Produit.stock_actuel)
+                  if stock != par_depots.get(id_produit, 0)]
+    print('stocks cohérents (total = somme des dépôts)' if not ecarts else f'ÉCARTS sur les produits {ecarts}')
+    if ecarts:
+        raise SystemExit(1)
+
+
+def bench_import(args):
+    """Débit de l'import en masse, en mode tout-ou-rien puis par lot."""
+    for tout_ou_rien in (True, False):
+        with app.app_context():
+            reinitialiser()
+            remplir(args.produits, 0)
+            lignes = [
+                {'code': f'P{random.randint(1, args.produits):07d}',
+                 'type_mouvement': random.choice(('ENTREE', 'SORTIE')),
+                 'quantite': random.randint(1, 20), 'motif': 'bench', 'reference_doc': 'BL-1'}
+                for _ in range(args.lignes)
+            ]
+            debut = time.perf_counter()
+            resultat = importer_mouvements(lignes, tout_ou_rien=tout_ou_rien, taille_lot=args.taille_lot)
+            duree = time.perf_counter() - debut
+            mode = 'tout-ou-rien' if tout_ou_rien else 'par lot'
+            print(f"{mode:>13} : {resultat['importees']} lignes en {duree:.2f} s "
+                  f"({resultat['importees'] / duree:.0f} lignes/s), {len(resultat['erreurs'])} erreurs")
+
+
+def bench_pagination(args):
+    """Latence de la première page et d'une page profonde de /mouvements."""
+    with app.app_context():
+        reinitialiser()
+        remplir(1000, args.mouvements, jours=5 * 365)
+        client = client_connecte()
+        # Curseur de la page demandée, obtenu une fois pour toutes
+        date_mouvement, id_mouvement = db.session.query(Mouvement.date_mouvement, Mouvement.id_mouvement).order_by(
+            Mouvement.date_mouvement.desc(), Mouvement.id_mouvement.desc()
+        ).offset((args.page - 1) * 20 - 1).limit(1).one()
+        urls = {'page 1': '/mouvements',
+                f'page {args.page}': '/mouvements?apres=' + encoder_curseur((date_mouvement, id_mouvement))}
+        print(f"{'':>12} {'médiane (ms)':>14} {'max (ms)':>10}")
+        for nom, url in urls.items():
+            durees = chronometrer(client, url, args.repetitions)
+            print(f'{nom:>12} {statistics.median(durees):>14.1f} {max(durees):>10.1f}')
+
+
+def bench_export(args):
+    """Export CSV des mouvements : premier octet, débit et pic mémoire sous un plafond."""
+    with app.app_context():
+        reinitialiser()
+        remplir(1000, args.mouvements, jours=365)
+        db.session.remove()
+    client = client_connecte()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    reponse = client.get('/export/mouvements.csv', buffered=False)
+    iterateur = iter(reponse.response)
+    octets = len(next(iterateur))
+    premier_octet = (time.perf_counter() - debut) * 1000
+    for morceau in iterateur:
+        octets += len(morceau)
+    duree = time.perf_counter() - debut
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    reponse.close()
+    pic_mo = pic / 1024 / 1024
+    print(f'{args.mouvements} mouvements, {octets / 1024 / 1024:.1f} Mo en {duree:.2f} s '
+          f'({args.mouvements / duree:.0f} lignes/s), premier octet en {premier_octet:.0f} ms, '
+          f'pic mémoire {pic_mo:.1f} Mo')
+    if pic_mo > args.plafond_mo:
+        print(f'PLAFOND DÉPASSÉ ({args.plafond_mo} Mo)')
+        raise SystemExit(1)
+
+
+def bench_historique(args):
+    """Stock à date : instantanés mensuels + rejeu partiel contre rejeu de tout l'historique."""
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, args.mouvements, jours=args.annees * 365)
+        maintenant = datetime.utcnow()
+        debut = time.perf_counter()
+        for mois in range(args.annees * 12, 0, -1):
+            prendre_instantane(maintenant - timedelta(days=30 * mois))
+        print(f'{args.annees * 12} instantanés mensuels rattrapés en {time.perf_counter() - debut:.1f} s')
+
+        def rejeu_complet(date_stock):
+            # Rejeu naïf : stock actuel moins tous les mouvements postérieurs
+            variations = dict(db.session.query(Mouvement.id_produit, db.func.sum(mouvement_signe()))
+                              .filter(Mouvement.date_mouvement > date_stock).group_by(Mouvement.id_produit))
+            return {id_produit: stock - (variations.get(id_produit) or 0)
+                    for id_produit, stock in db.session.query(Produit.id_produit, Produit.stock_actuel)}
+
+        print(f"{'recul':>8} {'instantanés (ms)':>17} {'rejeu complet (ms)':>19}")
+        for jours in (7, 90, 365, args.annees * 365 - 30):
+            date_stock = maintenant - timedelta(days=jours, hours=5)
+            mesures = {}
+            for nom, calcul in (('instantanes', lambda: {l.id_produit: l.quantite for l in stocks_au(date_stock)[1]}),
+                                ('complet', lambda: rejeu_complet(date_stock))):
+                durees = []
+                for _ in range(args.repetitions):
+                    t0 = time.perf_counter()
+                    resultat = calcul()
+                    durees.append((time.perf_counter() - t0) * 1000)
+                mesures[nom] = (statistics.median(durees), resultat)
+            assert mesures['instantanes'][1] == mesures['complet'][1], f'écart à {jours} jours'
+            print(f"{jours:>7}j {mesures['instantanes'][0]:>17.1f} {mesures['complet'][0]:>19.1f}")
+
+
+def bench_analyses(args):
+    """Durée du calcul vectorisé ABC / rotation / couverture sur tout le catalogue."""
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, args.mouvements, jours=args.annees * 365)
+        print(f"{'fenêtre':>8} {'médiane (s)':>12} {'max (s)':>9}")
+        for jours in (30, 365):
+            durees = []
+            for _ in range(args.repetitions):
+                debut = time.perf_counter()
+                calculer_analyses(jours)
+                durees.append(time.perf_counter() - debut)
+            print(f'{jours:>7}j {statistics.median(durees):>12.2f} {max(durees):>9.2f}')
+
+
+def bench_previsions(args):
+    """Calcul complet des prévisions selon la taille du pool, puis calcul incrémental."""
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, args.mouvements, jours=365)
+        for processus in args.processus:
+            debut = time.perf_counter()
+            nb = calculer_previsions(complet=True, processus=processus)
+            print(f'complet, {processus} processus : {nb} produits en {time.perf_counter() - debut:.2f} s')
+        for _ in range(args.modifies):
+            appliquer_mouvement(random.randint(1, args.produits), 'SORTIE', 1, 'bench')
+        db.session.commit()
+        debut = time.perf_counter()
+        nb = calculer_previsions()
+        print(f'incrémental : {nb} produits en {time.perf_counter() - debut:.2f} s')
+
+
+def bench_graphes(args):
+    """Graphiques sur un an : historique colonnaire contre stock à date recalculé en SQL."""
+    with app.app_context():
+        reinitialiser()
+        generer(args.produits, args.mouvements, jours=args.jours + 30)
+        app.config['HISTORIQUE_JOURS_INITIAUX'] = args.jours
+        debut = time.perf_counter()
+        historique_stocks.mettre_a_jour()
+        taille = sum(os.path.getsize(os.path.join(historique_stocks.dossier, nom))
+                     for nom in os.listdir(historique_stocks.dossier))
+        print(f'historique de {args.jours} jours écrit en {time.perf_counter() - debut:.1f} s '
+              f'({taille / 1e6:.1f} Mo)')
+
+        # Contrôle : la clôture d'il y a 101 jours doit égaler le stock à date du lendemain minuit
+        recul = min(100, args.jours - 1)
+        jour = datetime.utcnow().date() - timedelta(days=recul)
+        debut = time.perf_counter()
+        _, lignes = stocks_au(datetime.combine(jour, datetime.min.time()))
+        duree_sql = (time.perf_counter() - debut) * 1000
+        _, valeurs, _ = historique_stocks.valeurs('categorie', args.jours)
+        attendu = sum(float(ligne.valeur) for ligne in lignes)
+        assert abs(valeurs[len(valeurs) - 1 - recul].sum() - attendu) < 0.01, 'écart de valeur'
+
+        client = client_connecte()
+        print(f"{'graphique':>32} {'médiane (ms)':>14} {'max (ms)':>10}")
+        for dimension in ('categorie', 'fournisseur'):
+            durees = chronometrer(client, f'/api/historique/valeurs?par={dimension}&jours={args.jours}',
+                                  args.repetitions)
+            print(f'{dimension + f" sur {args.jours} jours":>32} {statistics.median(durees):>14.1f} {max(durees):>10.1f}')
+        durees = chronometrer(client, f'/api/historique/produits/1?jours={args.jours}', args.repetitions)
+        print(f'{f"produit sur {args.jours} jours":>32} {statistics.median(durees):>14.1f} {max(durees):>10.1f}')
+        print(f'SQL : un jour par stocks_au() en {duree_sql:.0f} ms, '
+              f'soit ~{duree_sql * args.jours / 1000:.0f} s pour {args.jours} jours')
+
+
+def bench_archivage(args):
+    """Pages courantes avec un an d'historique, puis avec `annees` ans dont tout sauf un an archivé."""
+    routes = ['/', '/produits', '/mouvements', '/alertes', '/api/stats', '/api/stock']
+    medianes = {}
+    with app.app_context():
+        for annees in (1, args.annees):
+            reinitialiser()
+            generer(args.produits, args.mouvements_par_an * annees, jours=365 * annees)
+            if annees > 1:
+                debut = time.perf_counter()
+                nb_mouvements, nb_alertes = archiver(365, 90)
+                print(f'{nb_mouvements} mouvements et {nb_alertes} alertes archivés en '
+                      f'{time.perf_counter() - debut:.1f} s')
+            print(f'{annees} an(s) : {Mouvement.query.count()} mouvements et {Alerte.query.count()} alertes en ligne')
+            client = client_connecte()
+            medianes[annees] = {url: statistics.median(chronometrer(client, url, args.repetitions)) for url in routes}
+
+        print(f"{'page':>14} {'1 an (ms)':>10} {f'{args.annees} ans (ms)':>12}")
+        for url in routes:
+            print(f'{url:>14} {medianes[1][url]:>10.1f} {medianes[args.annees][url]:>12.1f}')
+
+        # Chemin lent : l'historique archivé reste interrogeable
+        maintenant = datetime.utcnow()
+        debut = time.perf_counter()
+        stocks_au(maintenant - timedelta(days=365 * (args.annees - 1)))
+        print(f'stock à date il y a {args.annees - 1} ans : {(time.perf_counter() - debut) * 1000:.0f} ms')
+        mois = maintenant - timedelta(days=365 * (args.annees - 1))
+        debut = time.perf_counter()
+        nb = sum(1 for _ in lignes_export(requete_export('mouvements', mois, mois + timedelta(days=30))[1]))
+        print(f'export d\'un mois archivé : {nb} mouvements en {(time.perf_counter() - debut) * 1000:.0f} ms')
+
+
+def bench_recherche(args):
+    """Recherche par préfixe : résultats attendus (préfixes finissant par z ou 9) puis latence."""
+    app.config['TESTING'] = True
+    with app.app_context():
+        reinitialiser()
+        generer(args.produits, 0)
+        attendus = {'jaz': 'Jazz band', 'pizz': 'Pizza royale', 'm9': 'Vis M90 inox', 'lot 19': 'Lot 1989 recyclé',
+                    'ecrou zz': 'Écrou ZZ9 acier'}
+        for i, nom in enumerate(attendus.values(), args.produits + 1):
+            db.session.add(Produit(id_produit=i, code=f'R{i:07d}', nom=nom, unite='u', prix_unitaire=1))
+        db.session.commit()
+        reindexer_produits()
+        db.session.remove()
+    client = client_connecte()
+    erreurs = 0
+    for prefixe, nom in attendus.items():
+        noms = [p['nom'] for p in client.get(f'/api/produits/recherche?q={prefixe}&limite=50').get_json()]
+        if nom not in noms:
+            erreurs += 1
+            print(f'{prefixe!r} : {nom!r} absent de {noms}')
+    print(f"{'recherche':<24} {'médiane (ms)':>14} {'max (ms)':>10}")
+    for q in ('vis', 'cab', 'ecrou ac', 'p', 'z'):
+        durees = chronometrer(client, f'/api/produits/recherche?q={q}', args.repetitions)
+        print(f'{q:<24} {statistics.median(durees):>14.1f} {max(durees):>10.1f}')
+    if erreurs:
+        raise SystemExit(1)
+
+
+def bench_sync(args):
+    """Coût de /api/sync selon la taille du catalogue : premier chargement, delta, client à jour."""
+    app.config['SYNC_MARGE_SECONDES'] = 0
+
+    def synchroniser(client, jeton=None):
+        # Toutes les pages depuis `jeton` : (jeton final, octets reçus, durée en ms)
+        octets, debut = 0, time.perf_counter()
+        while True:
+            reponse = client.get('/api/sync', query_string={'since': jeton} if jeton else {},
+                                 headers={'Accept-Encoding': 'gzip'})
+            assert reponse.status_code == 200, reponse.status_code
+            octets += len(reponse.get_data())
+            donnees = reponse.get_json() if 'Content-Encoding' not in reponse.headers \
+                else json.loads(gzip.decompress(reponse.get_data()))
+            jeton = donnees['jeton']
+            if not donnees['suite']:
+                return jeton, octets, (time.perf_counter() - debut) * 1000
+
+    with app.app_context():
+        print(f"{'produits':>10} {'initial (ms)':>13} {'initial (ko)':>13} {'delta (ms)':>11} "
+              f"{'delta (ko)':>11} {'à jour (ms)':>12} {'à jour (o)':>11}")
+        for taille in args.tailles:
+            reinitialiser()
+            remplir(taille, args.mouvements)
+            initialiser_modifications()
+            client = client_connecte()
+            jeton, octets_initial, duree_initial = synchroniser(client)
+            for _ in range(args.modifications):
+                appliquer_mouvement(random.randint(1, taille), 'SORTIE', 1, 'bench')
+            db.session.commit()
+            jeton, octets_delta, duree_delta = synchroniser(client, jeton)
+            _, octets_a_jour, duree_a_jour = synchroniser(client, jeton)
+            print(f'{taille:>10} {duree_initial:>13.0f} {octets_initial / 1024:>13.0f} {duree_delta:>11.1f} '
+                  f'{octets_delta / 1024:>11.1f} {duree_a_jour:>12.1f} {octets_a_jour:>11}')
+
+
+class FauxRedis:
+    """Substitut de redis.Redis sans serveur : comme le client réel, get() rend des bytes."""
+
+    def __init__(self):
+        self._donnees = {}
+
+    def get(self, cle):
+        valeur, expiration = self._donnees.get(cle, (None, None))
+        if expiration is not None and expiration <= time.monotonic():
+            return None
+        return valeur
+
+    def set(self, cle, valeur, ex=None):
+        if not isinstance(valeur, (str, bytes, int, float)):
+            raise TypeError(f'Type non accepté par Redis : {type(valeur).__name__}')
+        valeur = valeur if isinstance(valeur, bytes) else str(valeur).encode()
+        self._donnees[cle] = (valeur, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *cles):
+        return sum(self._donnees.pop(cle, None) is not None for cle in cles)
+
+
+def bench_cache(args):
+    """Chemin Redis du cache (valeurs relues en bytes) sur un substitut en mémoire, sans serveur."""
+    app.config['TESTING'] = True
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, args.mouvements)
+        initialiser_depots()
+        balayer_alertes()
+        db.session.remove()
+    cache_origine, stockpro.cache = stockpro.cache, FauxRedis()
+    try:
+        client = client_connecte()
+        urls = ['/', '/alertes', '/produits?search=produit', '/mouvements', '/api/stats']
+        for url in urls:
+            # Premier passage : écriture du cache ; second : relecture des bytes
+            for _ in range(2):
+                reponse = client.get(url)
+                assert reponse.status_code == 200, (url, reponse.status_code)
+        etag = client.get('/api/stats').headers['ETag']
+        assert client.get('/api/stats', headers={'If-None-Match': etag}).status_code == 304
+        with app.test_request_context():
+            compteurs = compteurs_alertes()
+            assert compteurs == compteurs_alertes() and all(isinstance(n, int) for n in compteurs.values()), compteurs
+            total = total_approximatif('bench', Produit.query)
+            assert total == total_approximatif('bench', Produit.query) == args.produits, total
+            assert isinstance(version_stats(), str)
+            assert instantane_stats(7)[0] == instantane_stats(7)[0]
+            assert 'donnees' in instantane_tableau_de_bord()
+            version = version_stats()
+            reponse = client.post('/mouvement/nouveau', data={'id_produit': 1, 'type_mouvement': 'ENTREE',
+                                                               'quantite': 1, 'motif': 'bench'})
+            assert reponse.status_code == 302, reponse.status_code
+            assert version_stats() != version
+            assert client.get('/api/stats', headers={'If-None-Match': etag}).status_code == 200
+        print(f'{len(stockpro.cache._donnees)} clés écrites, relues en bytes sans erreur')
+    finally:
+        stockpro.cache = cache_origine
+
+
+def bench_budgets(args):
+    """Budgets de requêtes SQL des vues principales, en mode strict (échec au premier dépassement)."""
+    app.config['TESTING'] = True
+    with app.app_context():
+        reinitialiser()
+        remplir(args.produits, args.mouvements)
+        initialiser_depots()
+        db.session.remove()
+    client = client_connecte()
+    pages = ['/', '/produits', '/produits?tri=nom&search=produit', '/mouvements', '/alertes', '/mouvement/nouveau',
+             '/categories', '/fournisseurs', '/api/produits', '/api/produits/recherche?q=prod', '/api/stats']
+    echecs = 0
+    print(f"{'page':<36} {'requêtes':>9}")
+    for url in pages:
+        # Caches chauds : le budget porte sur le régime établi
+        app.config['BUDGETS_STRICTS'] = False
+        client.get(url)
+        app.config['BUDGETS_STRICTS'] = True
+        with compter_requetes() as requetes:
+            try:
+                client.get(url)
+                resultat = len(requetes)
+            except BudgetRequetesDepasse as erreur:
+                echecs += 1
+                resultat = f'DÉPASSÉ - {str(erreur).splitlines()[0]}'
+        print(f'{url:<36} {resultat:>9}')
+    with compter_requetes() as requetes:
+        try:
+            client.post('/mouvement/nouveau', data={'id_produit': 1, 'type_mouvement': 'ENTREE', 'quantite': 1, 'motif': 'bench'})
+            resultat = len(requetes)
+        except BudgetRequetesDepasse as erreur:
+            echecs += 1
+            resultat = f'DÉPASSÉ - {str(erreur).splitlines()[0]}'
+    print(f"{'POST /mouvement/nouveau':<36} {resultat:>9}")
+    if echecs:
+        raise SystemExit(1)
+
+
+def bench_generer(args):
+    """Remplit la base DATABASE_URL (à réutiliser ensuite avec `charge --reutiliser`)."""
+    with app.app_context():
+        reinitialiser()
+        debut = time.perf_counter()
+        generer(args.produits, args.mouvements, args.jours, args.categories, args.fournisseurs, args.graine)
+        print(f'{args.produits} produits, {args.mouvements} mouvements générés en {time.perf_counter() - debut:.0f} s '
+              f"dans {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+
+def percentiles(durees):
+    """p50/p95/p99 (ms) d'une liste de durées."""
+    if len(durees) < 2:
+        valeur = round(durees[0], 2) if durees else None
+        return {'p50': valeur, 'p95': valeur, 'p99': valeur}
+    coupures = statistics.quantiles(durees, n=100, method='inclusive')
+    return {'p50': round(coupures[49], 2), 'p95': round(coupures[94], 2), 'p99': round(coupures[98], 2)}
+
+
+def bench_charge(args):
+    """Charge mixte sur les vraies routes, en threads concurrents ; résultats en JSON."""
+    with app.app_context():
+        if not args.reutiliser:
+            reinitialiser()
+            generer(args.produits, args.mouvements, args.jours, graine=args.graine)
+        nb_produits = db.session.query(db.func.max(Produit.id_produit)).scalar()
+        nb_mouvements = db.session.query(db.func.count(Mouvement.id_mouvement)).scalar()
+        # Curseurs de pages profondes de /mouvements, tirés une fois pour toutes
+        curseurs = [encoder_curseur(ligne) for ligne in db.session.query(
+            Mouvement.date_mouvement, Mouvement.id_mouvement
+        ).order_by(Mouvement.date_mouvement.desc(), Mouvement.id_mouvement.desc()).offset(19)
+            .limit(min(nb_mouvements, 20 * 5000)).all()[::20]]
+        db.session.remove()
+
+    routes = {
+        'dashboard': (2, lambda h: ('GET', '/', None)),
+        'produits_recherche': (3, lambda h: ('GET', '/produits?search=' + h.choice(NOMS + QUALIFICATIFS), None)),
+        'mouvements_page': (3, lambda h: ('GET', '/mouvements?apres=' + h.choice(curseurs) if curseurs
+                                          else '/mouvements', None)),
+        'api_stats': (2, lambda h: ('GET', '/api/stats?jours=30', None)),
+        'nouveau_mouvement': (1, lambda h: ('POST', '/mouvement/nouveau', {
+            'id_produit': h.randint(1, nb_produits), 'type_mouvement': h.choice(('ENTREE', 'SORTIE')),
+            'quantite': h.randint(1, 10), 'motif': 'charge'})),
+    }
+    if args.routes:
+        routes = {nom: routes[nom] for nom in args.routes}
+    noms, poids = list(routes), [routes[nom][0] for nom in routes]
+    if not args.journal:
+        app.logger.setLevel(logging.ERROR)
+    mesures = []
+    verrou = threading.Lock()
+
+    def utilisateur(numero):
+        hasard = random.Random(args.graine + numero)
+        client = client_connecte()
+        locales = []
+        echeance = time.perf_counter() + args.duree
+        while time.perf_counter() < echeance:
+            nom = hasard.choices(noms, weights=poids)[0]
+            methode, url, donnees = routes[nom][1](hasard)
+            debut = time.perf_counter()
+            reponse = client.open(url, method=methode, data=donnees)
+            locales.append((nom, (time.perf_counter() - debut) * 1000, reponse.status_code))
+        with verrou:
+            mesures.extend(locales)
+
+    threads = [threading.Thread(target=utilisateur, args=(i,)) for i in range(args.concurrence)]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duree = time.perf_counter() - debut
+
+    def synthese(lignes):
+        durees = [ms for _, ms, _ in lignes]
+        return dict(requetes=len(lignes), erreurs=sum(1 for _, _, statut in lignes if statut >= 400),
+                    debit=round(len(lignes) / duree, 1),
+                    moyenne=round(statistics.fmean(durees), 2) if durees else None, **percentiles(durees))
+
+    try:
+        version = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        version = None
+    resultat = {
+        'version': version,
+        'date': datetime.utcnow().isoformat(timespec='seconds'),
+        'base': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+        'parametres': {'concurrence': args.concurrence, 'duree': args.duree, 'produits': nb_produits,
+                       'mouvements': nb_mouvements, 'routes': noms},
+        'global': synthese(mesures),
+        'routes': {nom: synthese([m for m in mesures if m[0] == nom]) for nom in noms},
+    }
+
+    print(f"{'route':<20} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+    for nom, stats in [*resultat['routes'].items(), ('TOTAL', resultat['global'])]:
+        print(f"{nom:<20} {stats['requetes']:>7} {stats['debit']:>8} {stats['p50'] or 0:>8} "
+              f"{stats['p95'] or 0:>8} {stats['p99'] or 0:>8} {stats['erreurs']:>5}")
+    with open(args.sortie, 'w', encoding='utf-8') as fichier:
+        json.dump(resultat, fichier, indent=2, ensure_ascii=False)
+    print(f'résultats écrits dans {args.sortie}')
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as fichier:
+            reference = json.load(fichier)
+        print(f"\ncomparaison avec {reference.get('version')} ({reference.get('date')}) : p95 et débit")
+        for nom, stats in [*resultat['routes'].items(), ('TOTAL', resultat['global'])]:
+            avant = reference['global'] if nom == 'TOTAL' else reference['routes'].get(nom)
+            if not avant or not avant.get('p95') or not stats['p95']:
+                continue
+            print(f"{nom:<20} p95 {avant['p95']:>8} -> {stats['p95']:>8} ({stats['p95'] / avant['p95'] - 1:+.0%})   "
+                  f"débit {avant['debit']:>7} -> {stats['debit']:>7} ({stats['debit'] / avant['debit'] - 1:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sous = parser.add_subparsers(dest='scenario', required=True)
+
+    p = sous.add_parser('dashboard', help='latence du tableau de bord selon la taille du catalogue')
+    p.add_argument('--tailles', type=int, nargs='+', default=[1000, 10000, 100000])
+    p.add_argument('--mouvements', type=int, default=50000)
+    p.add_argument('--repetitions', type=int, default=5)
+    p.set_defaults(func=bench_dashboard)
+
+    p = sous.add_parser('concurrence', help='mouvements concurrents : cohérence des stocks et débit')
+    p.add_argument('--threads', type=int, default=8)
+    p.add_argument('--mouvements', type=int, default=2000)
+    p.add_argument('--produits', type=int, default=5)
+    p.set_defaults(func=bench_concurrence)
+
+    p = sous.add_parser('depots', help='débit des mouvements concurrents selon le nombre de dépôts')
+    p.add_argument('--depots', type=int, nargs='+', default=[1, 2, 4, 8])
+    p.add_argument('--threads', type=int, default=8)
+    p.add_argument('--mouvements', type=int, default=2000)
+    p.add_argument('--produits', type=int, default=1)
+    p.add_argument('--tenue-ms', type=float, default=2, help='attente dans la transaction, en millisecondes')
+    p.set_defaults(func=bench_depots)
+
+    p = sous.add_parser('import', help="débit de l'import en masse des mouvements")
+    p.add_argument('--lignes', type=int, default=100000)
+    p.add_argument('--produits', type=int, default=1000)
+    p.add_argument('--taille-lot', type=int, default=1000)
+    p.set_defaults(func=bench_import)
+
+    p = sous.add_parser('pagination', help='première page contre page profonde des mouvements')
+    p.add_argument('--mouvements', type=int, default=1000000)
+    p.add_argument('--page', type=int, default=10000)
+    p.add_argument('--repetitions', type=int, default=5)
+    p.set_defaults(func=bench_pagination)
+
+    p = sous.add_parser('export', help='export CSV en flux : mémoire constante')
+    p.add_argument('--mouvements', type=int, default=1000000)
+    p.add_argument('--plafond-mo', type=float, default=50)
+    p.set_defaults(func=bench_export)
+
+    p = sous.add_parser('historique', help='stock à date : instantanés contre rejeu complet')
+    p.add_argument('--mouvements', type=int, default=1000000)
+    p.add_argument('--produits', type=int, default=1000)
+    p.add_argument('--annees', type=int, default=3)
+    p.add_argument('--repetitions', type=int, default=3)
+    p.set_defaults(func=bench_historique)
+
+    p = sous.add_parser('analyses', help='calcul des analyses de stock sur tout le catalogue')
+    p.add_argument('--produits', type=int, default=100000)
+    p.add_argument('--mouvements', type=int, default=2000000)
+    p.add_argument('--annees', type=int, default=5)
+    p.add_argument('--repetitions', type=int, default=3)
+    p.set_defaults(func=bench_analyses)
+
+    p = sous.add_parser('previsions', help='prévisions de demande : pool de processus et mode incrémental')
+    p.add_argument('--produits', type=int, default=100000)
+    p.add_argument('--mouvements', type=int, default=2000000)
+    p.add_argument('--processus', type=int, nargs='+', default=[1, os.cpu_count()])
+    p.add_argument('--modifies', type=int, default=100)
+    p.set_defaults(func=bench_previsions)
+
+    p = sous.add_parser('graphes', help='graphiques sur un an depuis l\'historique colonnaire')
+    p.add_argument('--produits', type=int, default=100000)
+    p.add_argument('--mouvements', type=int, default=2000000)
+    p.add_argument('--jours', type=int, default=365)
+    p.add_argument('--repetitions', type=int, default=5)
+    p.set_defaults(func=bench_graphes)
+
+    p = sous.add_parser('archivage', help="pages courantes avant et après 5 ans d'historique archivé")
+    p.add_argument('--produits', type=int, default=10000)
+    p.add_argument('--mouvements-par-an', type=int, default=400000)
+    p.add_argument('--annees', type=int, default=5)
+    p.add_argument('--repetitions', type=int, default=5)
+    p.set_defaults(func=bench_archivage)
+
+    p = sous.add_parser('recherche', help='recherche par préfixe : exactitude et latence')
+    p.add_argument('--produits', type=int, default=100000)
+    p.add_argument('--repetitions', type=int, default=5)
+    p.set_defaults(func=bench_recherche)
+
+    p = sous.add_parser('sync', help='synchronisation incrémentale : coût selon le catalogue et les modifications')
+    p.add_argument('--tailles', type=int, nargs='+', default=[10000, 100000])
+    p.add_argument('--mouvements', type=int, default=50000)
+    p.add_argument('--modifications', type=int, default=100)
+    p.set_defaults(func=bench_sync)
+
+    p = sous.add_parser('budgets', help='budgets de requêtes SQL par vue (mode strict)')
+    p.add_argument('--produits', type=int, default=1000)
+    p.add_argument('--mouvements', type=int, default=10000)
+    p.set_defaults(func=bench_budgets)
+
+    p = sous.add_parser('cache', help='chemin Redis du cache (bytes) sur un substitut sans serveur')
+    p.add_argument('--produits', type=int, default=1000)
+    p.add_argument('--mouvements', type=int, default=10000)
+    p.set_defaults(func=bench_cache)
+
+    p = sous.add_parser('generer', help='remplit DATABASE_URL avec un jeu de données synthétique réaliste')
+    p.add_argument('--produits', type=int, default=100000)
+    p.add_argument('--mouvements', type=int, default=20000000)
+    p.add_argument('--jours', type=int, default=1095)
+    p.add_argument('--categories', type=int, default=50)
+    p.add_argument('--fournisseurs', type=int, default=200)
+    p.add_argument('--graine', type=int, default=1)
+    p.set_defaults(func=bench_generer)
+
+    p = sous.add_parser('charge', help='test de charge des routes principales, percentiles en JSON')
+    p.add_argument('--concurrence', type=int, default=8)
+    p.add_argument('--duree', type=float, default=30, help='secondes')
+    p.add_argument('--produits', type=int, default=10000)
+    p.add_argument('--mouvements', type=int, default=500000)
+    p.add_argument('--jours', type=int, default=1095)
+    p.add_argument('--graine', type=int, default=1)
+    p.add_argument('--routes', nargs='+', choices=['dashboard', 'produits_recherche', 'mouvements_page',
+                                                    'api_stats', 'nouveau_mouvement'])
+    p.add_argument('--reutiliser', action='store_true', help='garder les données de DATABASE_URL (voir generer)')
+    p.add_argument('--journal', action='store_true', help='afficher requêtes lentes et budgets dépassés')
+    p.add_argument('--sortie', default='charge.json')
+    p.add_argument('--comparer', help='résultats JSON précédents à comparer')
+    p.set_defaults(func=bench_charge)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Configuration gunicorn de StockPro (surcharges via l'environnement)."""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+# L'attente longue de /api/stats bloque un fil par tableau de bord ouvert : réservée aux workers à plusieurs fils.
+# Elle guette la version des statistiques, commune à tous les workers seulement avec Redis ; sans Redis, un
+# client attendant sur un worker ne verrait pas les mouvements validés par un autre : simple interrogation
+if threads > 1 and (workers == 1 or os.environ.get('CACHE_REDIS_URL')):
+    os.environ.setdefault('STATS_ATTENTE_MAX', '30')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+# Modèles et gabarits chargés une seule fois dans le maître, partagés par fork
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Les connexions ouvertes par le maître ne doivent pas être partagées entre workers
+    from app import app, db
+    with app.app_context():
+        for moteur in db.engines.values():
+            moteur.dispose(close=False)
@@ -0,0 +1,4 @@
+"""Point d'entrée WSGI de production : gunicorn -c gunicorn.conf.py wsgi:app"""
+from app import preparer_app
+
+app = preparer_app()